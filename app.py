@@ -5,335 +5,704 @@ Extracts product attributes from URLs in a Google Shopping XML feed
 
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
-import re
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from selectolax.lexbor import LexborHTMLParser
+from lxml import etree
+import json
+try:
+    # Optional: RE2 matches in linear time with no catastrophic backtracking. Only the pyre2
+    # package is a drop-in for the re module; google-re2 (also imported as re2) has a different API
+    import re2
+except ImportError:
+    re2 = None
+if re2 is not None and hasattr(re2, 'IGNORECASE'):
+    re = re2
+else:
+    import re
+import ahocorasick
+try:
+    # Optional: multi-pattern DFA used to prefilter the extractor regexes in one pass
+    import hyperscan
+except ImportError:
+    hyperscan = None
 import pandas as pd
+import xlsxwriter
+import codecs
+import functools
+import hashlib
+import os
 import time
-from typing import Dict, List, Optional
-from io import BytesIO, StringIO
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Set, Tuple
+from io import BytesIO
 import traceback
 
 
+# Product pages larger than this are refused (or truncated when Content-Length is absent)
+_MAX_PAGE_BYTES = 4 * 1024 * 1024
+
+# Transient failures are retried with exponential backoff (0.3s, 0.6s, 1.2s), never sooner than the per-site delay
+_MAX_RETRIES = 3
+_RETRY_BACKOFF = 0.3
+_RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+# Upper bound of the concurrent workers setting, and so of connections pooled per host
+_MAX_WORKERS = 32
+
+# Google Shopping feeds use the 'g:' namespace; lxml expects Clark notation
+_G_NAMESPACE = '{http://base.google.com/ns/1.0}'
+_G_ID = f'{_G_NAMESPACE}id'
+_G_TITLE = f'{_G_NAMESPACE}title'
+_G_LINK = f'{_G_NAMESPACE}link'
+
+# Regex patterns are compiled once at import time and shared by every product page
+
+# Dimension formats as (name, pattern); each pattern's unit is captured as <name>_unit
+_DIM_FORMATS = [
+    # Metric with labels (152cm (L) x 76cm (W) x 80cm (H))
+    ('labelled', r'(\d+(?:\.\d+)?)\s*(?P<labelled_unit>cm|mm|m)\s*\(l\)\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*\(w\)\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*\(h\)'),
+    # Metric dimensions (2.72 x 11m, 152 x 76 x 80cm)
+    ('metric', r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*(?:x\s*(\d+(?:\.\d+)?))?\s*(?P<metric_unit>cm|mm|m)\b'),
+    # Imperial dimensions (107" x 36ft)
+    ('imperial', r'(\d+(?:\.\d+)?)\s*(?:"|\'|inch|inches|in)\s*x\s*(\d+(?:\.\d+)?)\s*(?P<imperial_unit>ft|feet|\')'),
+    # With "x" or "×" (152 x 76 x 80 cm)
+    ('multiplied', r'(\d+(?:\.\d+)?)\s*[x×]\s*(\d+(?:\.\d+)?)\s*(?:[x×]\s*(\d+(?:\.\d+)?))?\s*(?P<multiplied_unit>cm|mm|m|inches?|ft)\b'),
+    # Dimensions: or Size: prefix
+    ('prefixed', r'(?:dimensions?|size|measurements?):\s*(\d+(?:\.\d+)?)\s*(?:x|×)\s*(\d+(?:\.\d+)?)\s*(?:(?:x|×)\s*(\d+(?:\.\d+)?))?\s*(?P<prefixed_unit>cm|mm|m|inches?|ft)?'),
+    # Table size format
+    ('table', r'(?:table size|product size|paper size):\s*(\d+(?:\.\d+)?)\s*(?P<table_unit>cm|mm|m)\s*(?:\(l\))?\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)'),
+    # Width x Height x Depth (gaps bounded so the scan stays linear)
+    ('whd', r'(?:width|w):\s*(\d+(?:\.\d+)?)\s*(?P<whd_unit>cm|mm|m|").{0,200}?(?:height|h):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m|").{0,200}?(?:depth|d):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m|")'),
+    # Single dimension formats
+    ('single', r'(\d+(?:\.\d+)?)\s*(?P<single_unit>cm|mm|m)\s*(?:wide|width|height|tall|long|length)'),
+]
+
+# All formats in one alternation so the text is scanned once; match.lastgroup names the format.
+# Patterns are lower-case and run against pre-lowered text, so no IGNORECASE is needed
+_DIM_COMBINED = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in _DIM_FORMATS))
+
+# Earlier formats win over later ones wherever they appear in the text
+_DIM_PRIORITY = {name: priority for priority, (name, _) in enumerate(_DIM_FORMATS)}
+
+
+def _dimension_number_groups() -> Dict[str, List[int]]:
+    """Map each dimension format to the group numbers of its numeric captures"""
+    starts = sorted((_DIM_COMBINED.groupindex[name], name) for name, _ in _DIM_FORMATS)
+    ends = [start for start, _ in starts[1:]] + [_DIM_COMBINED.groups + 1]
+    return {
+        name: [g for g in range(start + 1, end) if g != _DIM_COMBINED.groupindex[f'{name}_unit']]
+        for (start, name), end in zip(starts, ends)
+    }
+
+
+_DIM_NUMBER_GROUPS = _dimension_number_groups()
+
+# Symbol units written out in the dimensions string
+_UNIT_NAMES = {'"': 'in', "'": 'ft'}
+
+_WEIGHT_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r'(?:Net Weight|Weight|Net):\s*(\d+(?:\.\d+)?)\s*(?:kg|g|lbs)',
+    r'(\d+(?:\.\d+)?)\s*(?:kg|kgs)(?:\s|$|,)',
+]]
+
+_COLOURS = [
+    'black', 'white', 'red', 'blue', 'green', 'yellow', 'orange',
+    'purple', 'pink', 'brown', 'grey', 'gray', 'silver', 'gold',
+    'navy', 'beige', 'cream', 'multicolour', 'multi-colour', 'turquoise',
+    'cyan', 'magenta', 'maroon', 'olive', 'teal', 'lime', 'indigo',
+    'violet', 'coral', 'salmon', 'khaki', 'burgundy', 'champagne',
+    'bronze', 'copper', 'rose', 'mint', 'lavender', 'peach', 'cherry',
+    'ivory', 'pearl', 'charcoal', 'slate', 'emerald', 'sapphire', 'ruby'
+]
+
+_MATERIALS = [
+    'MDF', 'wood', 'metal', 'steel', 'aluminium', 'aluminum',
+    'plastic', 'PVC', 'fabric', 'leather', 'foam', 'rubber',
+    'glass', 'ceramic', 'carbon', 'composite', 'nylon', 'polyester',
+    'paper', 'cardboard', 'cotton', 'wool', 'silk', 'linen',
+    'vinyl', 'acrylic', 'resin', 'bamboo', 'oak', 'pine', 'mahogany',
+    'stainless steel', 'brass', 'chrome', 'titanium', 'fiberglass'
+]
+
+_PATTERNS = [
+    'striped', 'stripes', 'polka dot', 'floral', 'paisley', 'plaid',
+    'checkered', 'checked', 'chevron', 'geometric', 'animal print',
+    'leopard', 'zebra', 'camouflage', 'camo', 'solid', 'plain'
+]
+
+
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    """Build one Aho-Corasick automaton over the colour, material and pattern keywords"""
+    keywords: Dict[str, List] = defaultdict(list)
+    for category, words in (('colour', _COLOURS), ('material', _MATERIALS), ('pattern', _PATTERNS)):
+        for word in words:
+            keywords[word.lower()].append((category, word))
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, entries in keywords.items():
+        automaton.add_word(keyword, (keyword, entries))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _find_keywords(text_lower: str) -> Dict[str, List[str]]:
+    """Find whole-word colour, material and pattern keywords in a single pass over lower-cased text
+    
+    Returns keyword names per category in order of appearance. Overlaps within a category
+    resolve leftmost-longest, so 'stainless steel' is reported once rather than also as 'steel'.
+    """
+    candidates = defaultdict(list)
+    for end, (keyword, entries) in _KEYWORD_AUTOMATON.iter(text_lower):
+        start = end - len(keyword) + 1
+        # Recover \b semantics: reject hits embedded in a longer word
+        if start > 0 and _is_word_char(text_lower[start - 1]):
+            continue
+        if end + 1 < len(text_lower) and _is_word_char(text_lower[end + 1]):
+            continue
+        for category, word in entries:
+            candidates[category].append((start, end, word))
+    
+    hits = {'colour': [], 'material': [], 'pattern': []}
+    for category, matches in candidates.items():
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        last_end = -1
+        for start, end, word in matches:
+            if start > last_end:
+                hits[category].append(word)
+                last_end = end
+    
+    return hits
+
+
+_COLOUR_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r'(?:Colour|Color):\s*([A-Za-z\s\-]+)',
+    r'(?:Available in|Finish|Shade):\s*([A-Za-z\s\-]+)',
+    r'([A-Za-z]+)\s+(?:Seamless|Background|Paper|Fabric|Material)',
+]]
+
+_RGB_RE = re.compile(r'RGB\s*Values?:\s*\((\d+),\s*(\d+),\s*(\d+)\)', re.IGNORECASE)
+
+_MATERIAL_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r'(?:Construction|Material|Made from|Manufactured from):\s*([A-Za-z\s\-/]+)',
+    r'(?:^|\s)(\d+%\s*recycled\s+[a-z]+)',
+    r'(?:high quality|premium)\s{1,5}([a-z]{1,30}\s{1,5}paper)',
+]]
+
+_PATTERN_RE = re.compile(r'(?:Pattern):\s*([A-Za-z\s\-]+)', re.IGNORECASE)
+
+_SIZE_APPAREL_RES = [re.compile(p, re.IGNORECASE) for p in [
+    r'\b((?:XX?|[23X])?[SML](?:arge|edium|mall)?)\b',  # XS, S, M, L, XL, XXL, etc
+    r'\bsize:?\s*([A-Z0-9\-/]+)\b',
+    r'\b(\d+(?:\.\d+)?)\s*(?:UK|US|EU)\b',  # UK 10, US 8, EU 42
+    r'\bone size\b',
+    r'\bOSFA\b',  # One Size Fits All
+]]
+
+_GSM_RE = re.compile(r'(\d+)\s*gsm')
+
+_GTIN_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r'(?:GTIN|EAN|UPC|Barcode):\s*(\d{8,14})',
+    r'(?:Product Code|Item Code|SKU):\s*([A-Z0-9\-]+)',
+]]
+
+_MOTOR_RE = re.compile(r'(\d+W?\s*(?:motor|watt|power)|\d+W)', re.IGNORECASE)
+
+_WARRANTY_RE = re.compile(r'(\d+\s*(?:month|year|yr)\s*(?:warranty|guarantee))', re.IGNORECASE)
+
+_BRAND_RE = re.compile(r'(?:Brand|Manufacturer):\s*([A-Za-z0-9\s\-&]+)', re.IGNORECASE)
+
+# Extractor regexes that hyperscan prefilters; index in this list is the hyperscan pattern id
+_PRESCAN_PATTERNS = [
+    _DIM_COMBINED, *_WEIGHT_PATTERNS, *_COLOUR_PATTERNS, _RGB_RE, *_MATERIAL_PATTERNS, _PATTERN_RE,
+    *_SIZE_APPAREL_RES,
+]
+
+
+def _prescan_expression(pattern) -> bytes:
+    """Hyperscan expression for a regex, with bounded repeats widened to '*'
+    
+    Widening only ever matches more, which is safe for a prefilter, and avoids the slow
+    compile of large bounded repeats such as .{0,200} in UTF-8 mode.
+    """
+    return re.sub(r'\{\d*,?\d*\}', '*', pattern.pattern).encode('utf-8')
+
+
+def _build_prescan_database():
+    """Compile the prescan patterns into one hyperscan database
+    
+    Returns the database (None without hyperscan) and the patterns hyperscan cannot compile,
+    which are treated as always possibly matching.
+    """
+    if hyperscan is None:
+        return None, set()
+    
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SINGLEMATCH
+    supported_ids = list(range(len(_PRESCAN_PATTERNS)))
+    unsupported = set()
+    
+    def compile_database(pattern_ids):
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[_prescan_expression(_PRESCAN_PATTERNS[i]) for i in pattern_ids],
+            ids=pattern_ids,
+            elements=len(pattern_ids),
+            flags=flags,
+        )
+        return database
+    
+    try:
+        return compile_database(supported_ids), unsupported
+    except hyperscan.error:
+        pass
+    
+    # Find the patterns hyperscan rejects and leave them out of the database
+    for pattern_id in list(supported_ids):
+        try:
+            compile_database([pattern_id])
+        except hyperscan.error:
+            supported_ids.remove(pattern_id)
+            unsupported.add(_PRESCAN_PATTERNS[pattern_id])
+    
+    if not supported_ids:
+        return None, set()
+    return compile_database(supported_ids), unsupported
+
+
+_PRESCAN_DB, _PRESCAN_ALWAYS = _build_prescan_database()
+
+
+# Characters Python's re treats like ASCII ones but hyperscan does not. Hyperscan's whitespace,
+# digit and caseless matching are ASCII-only (UCP mode would fix that but rejects word
+# boundaries), so a non-breaking space in "120&nbsp;x&nbsp;60&nbsp;cm" would otherwise rule out
+# a pattern Python matches. Text is translated before scanning, which only widens matches.
+
+# Everything str.isspace() accepts other than ' ', mapped to a space
+_UNICODE_SPACES = (
+    '\t\n\v\f\r\x1c\x1d\x1e\x1f\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005'
+    '\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000'
+)
+
+# The zero of every non-ASCII run of ten decimal digits (Unicode 15), mapped to '0'-'9'
+_UNICODE_DIGIT_ZEROS = (
+    0x0660, 0x06F0, 0x07C0, 0x0966, 0x09E6, 0x0A66, 0x0AE6, 0x0B66, 0x0BE6, 0x0C66, 0x0CE6,
+    0x0D66, 0x0DE6, 0x0E50, 0x0ED0, 0x0F20, 0x1040, 0x1090, 0x17E0, 0x1810, 0x1946, 0x19D0,
+    0x1A80, 0x1A90, 0x1B50, 0x1BB0, 0x1C40, 0x1C50, 0xA620, 0xA8D0, 0xA900, 0xA9D0, 0xA9F0,
+    0xAA50, 0xABF0, 0xFF10, 0x104A0, 0x10D30, 0x11066, 0x110F0, 0x11136, 0x111D0, 0x112F0,
+    0x11450, 0x114D0, 0x11650, 0x116C0, 0x11730, 0x118E0, 0x11950, 0x11C50, 0x11D50, 0x11DA0,
+    0x11F50, 0x16A60, 0x16AC0, 0x16B50, 0x1D7CE, 0x1D7D8, 0x1D7E2, 0x1D7EC, 0x1D7F6, 0x1E140,
+    0x1E2F0, 0x1E4F0, 0x1E950, 0x1FBF0,
+)
+
+_PRESCAN_TRANSLATION = {
+    **{ord(c): ' ' for c in _UNICODE_SPACES},
+    **{zero + digit: str(digit) for zero in _UNICODE_DIGIT_ZEROS for digit in range(10)},
+    # Letters IGNORECASE folds to ASCII: dotted and dotless I, long s and the Kelvin sign
+    0x130: 'i', 0x131: 'i', 0x17F: 's', 0x212A: 'k',
+}
+
+# Hyperscan scratch space may not be shared between threads
+_prescan_local = threading.local()
+
+
+def _prescan(text: str) -> Optional[Set]:
+    """Return the extractor regexes that can match somewhere in the text, in a single pass
+    
+    Hyperscan only reports which patterns matched, not their groups, so extractors still run
+    the regex itself, but skip any pattern not in this set. Returns None (no filtering)
+    when hyperscan is not installed.
+    """
+    if _PRESCAN_DB is None:
+        return None
+    
+    scratch = getattr(_prescan_local, 'scratch', None)
+    if scratch is None:
+        scratch = _prescan_local.scratch = hyperscan.Scratch(_PRESCAN_DB)
+    
+    matched = set(_PRESCAN_ALWAYS)
+    
+    def on_match(pattern_id, start, end, flags, context):
+        matched.add(_PRESCAN_PATTERNS[pattern_id])
+    
+    _PRESCAN_DB.scan(
+        text.translate(_PRESCAN_TRANSLATION).encode('utf-8'), match_event_handler=on_match, scratch=scratch,
+    )
+    return matched
+
+
+def _can_match(pattern, candidates: Optional[Set]) -> bool:
+    return candidates is None or pattern in candidates
+
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_:.\-]+)', re.IGNORECASE)
+
+
+def _declared_charset(response: requests.Response) -> Optional[str]:
+    """Charset from the Content-Type header, or None if the header does not carry one
+    
+    requests falls back to ISO-8859-1 for any text/* response without a charset, which
+    would override the page's own <meta charset>, so that default is not trusted.
+    """
+    if 'charset=' not in response.headers.get('Content-Type', '').lower():
+        return None
+    return response.encoding
+
+
+def _decode_page(body: bytes, charset: Optional[str]) -> str:
+    """Decode a page body for Lexbor, which would otherwise read raw bytes as UTF-8
+    
+    Tries the HTTP charset, then the page's <meta> charset, then strict UTF-8, and finally
+    windows-1252 (a superset of ISO-8859-1 and the usual charset of undeclared legacy pages).
+    """
+    candidates = [charset] if charset else []
+    meta_match = _META_CHARSET_RE.search(body[:4096])
+    if meta_match:
+        candidates.append(meta_match.group(1).decode('ascii'))
+    
+    for encoding in candidates:
+        try:
+            return body.decode(encoding, errors='replace')
+        except LookupError:
+            continue
+    
+    try:
+        if len(body) >= _MAX_PAGE_BYTES:
+            # Cut off by the download cap, so a trailing partial character is dropped rather
+            # than sending the whole page to windows-1252; invalid bytes elsewhere still fail
+            return codecs.getincrementaldecoder('utf-8')().decode(body, final=False)
+        return body.decode('utf-8')
+    except UnicodeDecodeError:
+        return body.decode('windows-1252', errors='replace')
+
+
+@functools.lru_cache(maxsize=4096)
+def _netloc(url: str) -> str:
+    return urlparse(url).netloc
+
+
 class FeedAttributeScraper:
-    def __init__(self):
+    def __init__(self, delay: float = 0.0, max_connections: int = 10):
+        # A single Session is shared by all worker threads for connection pooling
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,*/*;q=0.8',
+            # gzip/deflate, plus br when a brotli decoder is installed
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
         })
         
-    def extract_products_from_xml(self, xml_content: bytes) -> List[Dict[str, str]]:
-        """Extract product data (ID, title, URL) from Google Shopping XML feed"""
-        products = []
-        try:
-            root = ET.fromstring(xml_content)
-            
-            # Handle namespace - Google Shopping feeds typically use 'g:' namespace
-            namespaces = {'g': 'http://base.google.com/ns/1.0'}
-            
-            # Find all items
-            items = root.findall('.//item')
-            
-            for item in items:
-                product = {}
-                
-                # Extract ID
-                id_elem = item.find('g:id', namespaces)
-                if id_elem is None:
-                    id_elem = item.find('id')
-                if id_elem is not None and id_elem.text:
-                    product['id'] = id_elem.text.strip()
-                
-                # Extract title
-                title_elem = item.find('g:title', namespaces)
-                if title_elem is None:
-                    title_elem = item.find('title')
-                if title_elem is not None and title_elem.text:
-                    product['title'] = title_elem.text.strip()
-                
-                # Extract link
-                link_elem = item.find('g:link', namespaces)
-                if link_elem is None:
-                    link_elem = item.find('link')
-                if link_elem is not None and link_elem.text:
-                    url = link_elem.text.strip()
-                    if url.startswith('http'):
-                        product['url'] = url
-                
-                # Only add if we have at least a URL
-                if 'url' in product:
-                    products.append(product)
-            
-            return products
-            
-        except Exception as e:
-            st.error(f"Error parsing XML: {e}")
-            return []
+        # Size the pool to the most workers a run can use so concurrent requests to one
+        # host reuse keep-alive connections instead of discarding them
+        adapter = HTTPAdapter(
+            pool_connections=max_connections,
+            pool_maxsize=max_connections,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Per-host politeness: minimum seconds between requests to the same host
+        self.delay = delay
+        self._host_locks = defaultdict(threading.Lock)
+        self._host_locks_guard = threading.Lock()
+        self._last_request_at: Dict[str, float] = {}
+    
+    def wait_for_host(self, url: str, delay: Optional[float] = None):
+        """Block until at least `delay` seconds (default self.delay) have passed since this host was last hit"""
+        if delay is None:
+            delay = self.delay
+        host = _netloc(url)
+        with self._host_locks_guard:
+            host_lock = self._host_locks[host]
+        
+        with host_lock:
+            last = self._last_request_at.get(host)
+            if last is not None:
+                remaining = delay - (time.monotonic() - last)
+                if remaining > 0:
+                    time.sleep(remaining)
+            self._last_request_at[host] = time.monotonic()
     
+    def get_with_retries(self, url: str, delay: Optional[float] = None) -> requests.Response:
+        """Stream a GET, retrying transient failures through wait_for_host so retries respect the delay"""
+        for attempt in range(_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(_RETRY_BACKOFF * 2 ** (attempt - 1))
+            self.wait_for_host(url, delay)
+            try:
+                response = self.session.get(url, timeout=15, stream=True)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == _MAX_RETRIES:
+                    raise
+                continue
+            if response.status_code in _RETRY_STATUSES and attempt < _MAX_RETRIES:
+                response.close()
+                continue
+            return response
+        
     def scrape_product_attributes(self, product_data: Dict[str, str]) -> Dict[str, str]:
         """Scrape product attributes from a single product page"""
+        attributes, content = self.fetch_product_page(product_data)
+        return self.parse_product_attributes(attributes, content)
+    
+    def fetch_product_page(self, product_data: Dict[str, str],
+                           delay: Optional[float] = None) -> Tuple[Dict[str, str], Optional[str]]:
+        """Download a product page, returning the product attributes and decoded page content (None on failure)"""
         # Start with existing product data (id, title, url)
         attributes = product_data.copy()
         url = attributes.get('url', '')
         
         if not url:
             attributes['error'] = 'No URL provided'
+            return attributes, None
+        
+        try:
+            with self.get_with_retries(url, delay) as response:
+                response.raise_for_status()
+                
+                content_length = response.headers.get('Content-Length', '')
+                if content_length.isdigit() and int(content_length) > _MAX_PAGE_BYTES:
+                    attributes['error'] = f"Page too large: {int(content_length)} bytes"
+                    return attributes, None
+                
+                # Content-Length may be missing or wrong, so cap what is actually read too
+                chunks = []
+                total = 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    chunks.append(chunk)
+                    total += len(chunk)
+                    if total >= _MAX_PAGE_BYTES:
+                        break
+                
+                body = b''.join(chunks)[:_MAX_PAGE_BYTES]
+                return attributes, _decode_page(body, _declared_charset(response))
+            
+        except requests.exceptions.RequestException as e:
+            attributes['error'] = f"Request error: {str(e)}"
+            return attributes, None
+        except Exception as e:
+            # e.g. ValueError from urlparse or a bare urllib3 LocationParseError for a malformed link
+            attributes['error'] = f"Processing error: {str(e)}"
+            return attributes, None
+    
+    def parse_product_attributes(self, attributes: Dict[str, str], content: Optional[str]) -> Dict[str, str]:
+        """Extract product attributes from downloaded page content"""
+        if content is None:
             return attributes
         
         try:
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            tree = LexborHTMLParser(content)
             
-            # Extract all text content for pattern matching
-            page_text = soup.get_text()
+            # Extract all text content for pattern matching, plus lower-cased copies
+            page_text = tree.body.text(separator=' ', strip=True) if tree.body is not None else ''
+            page_text_lower = page_text.lower()
             title = attributes.get('title', '')
+            title_lower = title.lower()
+            
+            # Regexes that can match the title or page text, found in one hyperscan pass
+            candidates = _prescan(f"{title} {page_text}")
+            
+            # Find colour/material/pattern keywords in one pass for the extractors below
+            keyword_hits = _find_keywords(page_text_lower)
             
             # Extract dimensions (for product_detail or custom use)
-            dimensions = self.extract_dimensions(page_text, title)
+            dimensions = self.extract_dimensions(page_text, title, page_text_lower, title_lower, candidates)
             if dimensions:
                 attributes['size_dimensions'] = dimensions
             
             # Extract weight (for shipping_weight attribute)
-            weight = self.extract_weight(page_text)
+            weight = self.extract_weight(page_text, candidates)
             if weight:
                 attributes['weight'] = weight
             
             # Extract colour (REQUIRED for apparel)
-            colour = self.extract_colour(page_text, soup, title)
+            colour = self.extract_colour(page_text, tree, title, keyword_hits, title_lower, candidates)
             if colour:
                 attributes['color'] = colour
             
             # Extract material (REQUIRED for apparel)
-            material = self.extract_material(page_text)
+            material = self.extract_material(page_text, keyword_hits, candidates)
             if material:
                 attributes['material'] = material
             
             # Extract pattern
-            pattern = self.extract_pattern(page_text)
+            pattern = self.extract_pattern(page_text, keyword_hits, candidates)
             if pattern:
                 attributes['pattern'] = pattern
             
             # Extract size (for apparel size attribute)
-            size = self.extract_size(page_text, title)
+            size = self.extract_size(page_text, title, candidates)
             if size:
                 attributes['size'] = size
             
             # Extract table data if available
-            table_data = self.extract_table_data(soup)
+            table_data = self.extract_table_data(tree)
             attributes.update(table_data)
             
             return attributes
             
-        except requests.exceptions.RequestException as e:
-            attributes['error'] = f"Request error: {str(e)}"
-            return attributes
         except Exception as e:
             attributes['error'] = f"Processing error: {str(e)}"
             return attributes
     
-    def extract_dimensions(self, text: str, title: str = "") -> Optional[str]:
+    def extract_dimensions(self, text: str, title: str = "", text_lower: Optional[str] = None,
+                           title_lower: Optional[str] = None, candidates: Optional[Set] = None) -> Optional[str]:
         """Extract product dimensions in various formats"""
+        if not _can_match(_DIM_COMBINED, candidates):
+            return None
+        
+        if text_lower is None:
+            text_lower = text.lower()
+        if title_lower is None:
+            title_lower = title.lower()
+        
         # Combine text sources
-        search_text = f"{title} {text}"
+        search_text = f"{title_lower} {text_lower}"
         
-        patterns = [
-            # Metric with labels (152cm (L) x 76cm (W) x 80cm (H))
-            r'(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*\(L\)\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*\(W\)\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*\(H\)',
-            # Metric dimensions (2.72 x 11m, 152 x 76 x 80cm)
-            r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*(?:x\s*(\d+(?:\.\d+)?))?\s*(?:cm|mm|m)\b',
-            # Imperial dimensions (107" x 36ft)
-            r'(\d+(?:\.\d+)?)\s*(?:"|\'|inch|inches|in)\s*x\s*(\d+(?:\.\d+)?)\s*(?:ft|feet|\')',
-            # With "x" or "×" (152 x 76 x 80 cm)
-            r'(\d+(?:\.\d+)?)\s*[xX×]\s*(\d+(?:\.\d+)?)\s*(?:[xX×]\s*(\d+(?:\.\d+)?))?\s*(?:cm|mm|m|inches?|ft)\b',
-            # Dimensions: or Size: prefix
-            r'(?:Dimensions?|Size|Measurements?):\s*(\d+(?:\.\d+)?)\s*(?:x|×)\s*(\d+(?:\.\d+)?)\s*(?:(?:x|×)\s*(\d+(?:\.\d+)?))?\s*(?:cm|mm|m|inches?|ft)?',
-            # Table size format
-            r'(?:Table size|Product size|Paper size):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*(?:\(L\))?\s*x\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m)',
-            # Width x Height x Depth
-            r'(?:Width|W):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m|").*?(?:Height|H):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m|").*?(?:Depth|D):\s*(\d+(?:\.\d+)?)\s*(?:cm|mm|m|")',
-            # Single dimension formats
-            r'(\d+(?:\.\d+)?)\s*(?:cm|mm|m)\s*(?:wide|width|height|tall|long|length)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
-            if match:
-                dims = [g for g in match.groups() if g]
-                if dims:
-                    # Try to extract unit
-                    unit_match = re.search(r'(cm|mm|m|inches?|in|ft|feet)', match.group(0), re.IGNORECASE)
-                    unit = unit_match.group(1) if unit_match else 'cm'
-                    return ' x '.join(dims) + f' {unit}'
+        match = None
+        for candidate in _DIM_COMBINED.finditer(search_text):
+            if match is None or _DIM_PRIORITY[candidate.lastgroup] < _DIM_PRIORITY[match.lastgroup]:
+                match = candidate
+                if _DIM_PRIORITY[match.lastgroup] == 0:
+                    break
+        
+        if match:
+            dim_format = match.lastgroup
+            dims = [match.group(g) for g in _DIM_NUMBER_GROUPS[dim_format] if match.group(g)]
+            unit = match.group(f'{dim_format}_unit') or 'cm'
+            return ' x '.join(dims) + f' {_UNIT_NAMES.get(unit, unit)}'
         
         return None
     
-    def extract_weight(self, text: str) -> Optional[str]:
+    def extract_weight(self, text: str, candidates: Optional[Set] = None) -> Optional[str]:
         """Extract product weight"""
-        patterns = [
-            r'(?:Net Weight|Weight|Net):\s*(\d+(?:\.\d+)?)\s*(?:kg|g|lbs)',
-            r'(\d+(?:\.\d+)?)\s*(?:kg|kgs)(?:\s|$|,)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _WEIGHT_PATTERNS:
+            if not _can_match(pattern, candidates):
+                continue
+            match = pattern.search(text)
             if match:
                 return match.group(0).strip()
         
         return None
     
-    def extract_colour(self, text: str, soup: BeautifulSoup, title: str = "") -> Optional[str]:
+    def extract_colour(self, text: str, tree: LexborHTMLParser, title: str = "",
+                       keyword_hits: Optional[Dict[str, List[str]]] = None,
+                       title_lower: Optional[str] = None, candidates: Optional[Set] = None) -> Optional[str]:
         """Extract product colour"""
         # Combine sources
         search_text = f"{title} {text}"
         
-        # Expanded colour list
-        colours = [
-            'black', 'white', 'red', 'blue', 'green', 'yellow', 'orange', 
-            'purple', 'pink', 'brown', 'grey', 'gray', 'silver', 'gold',
-            'navy', 'beige', 'cream', 'multicolour', 'multi-colour', 'turquoise',
-            'cyan', 'magenta', 'maroon', 'olive', 'teal', 'lime', 'indigo',
-            'violet', 'coral', 'salmon', 'khaki', 'burgundy', 'champagne',
-            'bronze', 'copper', 'rose', 'mint', 'lavender', 'peach', 'cherry',
-            'ivory', 'pearl', 'charcoal', 'slate', 'emerald', 'sapphire', 'ruby'
-        ]
-        
         # Look for explicit colour mentions with patterns
-        colour_patterns = [
-            r'(?:Colour|Color):\s*([A-Za-z\s\-]+)',
-            r'(?:Available in|Finish|Shade):\s*([A-Za-z\s\-]+)',
-            r'([A-Za-z]+)\s+(?:Seamless|Background|Paper|Fabric|Material)',
-        ]
-        
-        for pattern in colour_patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
+        for pattern in _COLOUR_PATTERNS:
+            if not _can_match(pattern, candidates):
+                continue
+            match = pattern.search(search_text)
             if match:
                 colour_text = match.group(1).strip().lower()
-                for colour in colours:
+                for colour in _COLOURS:
                     if colour in colour_text:
                         return colour.capitalize()
         
         # Look for RGB values
-        rgb_pattern = r'RGB\s*Values?:\s*\((\d+),\s*(\d+),\s*(\d+)\)'
-        rgb_match = re.search(rgb_pattern, text, re.IGNORECASE)
+        rgb_match = _RGB_RE.search(text) if _can_match(_RGB_RE, candidates) else None
         if rgb_match:
             # Try to find a colour name near the RGB value
             context = text[max(0, rgb_match.start()-100):rgb_match.end()+50]
-            for colour in colours:
-                if re.search(rf'\b{colour}\b', context, re.IGNORECASE):
-                    return colour.capitalize()
+            context_colours = _find_keywords(context.lower())['colour']
+            if context_colours:
+                return context_colours[0].capitalize()
         
         # Look for colour names in title or general text
-        text_lower = search_text.lower()
-        for colour in colours:
-            if re.search(rf'\b{colour}\b', text_lower):
-                return colour.capitalize()
+        if keyword_hits is None:
+            keyword_hits = _find_keywords(text.lower())
+        if title_lower is None:
+            title_lower = title.lower()
+        colours = _find_keywords(title_lower)['colour'] + keyword_hits['colour']
+        if colours:
+            return colours[0].capitalize()
         
         return None
     
-    def extract_material(self, text: str) -> Optional[str]:
+    def extract_material(self, text: str, keyword_hits: Optional[Dict[str, List[str]]] = None,
+                         candidates: Optional[Set] = None) -> Optional[str]:
         """Extract product material"""
-        materials = [
-            'MDF', 'wood', 'metal', 'steel', 'aluminium', 'aluminum', 
-            'plastic', 'PVC', 'fabric', 'leather', 'foam', 'rubber',
-            'glass', 'ceramic', 'carbon', 'composite', 'nylon', 'polyester',
-            'paper', 'cardboard', 'cotton', 'wool', 'silk', 'linen',
-            'vinyl', 'acrylic', 'resin', 'bamboo', 'oak', 'pine', 'mahogany',
-            'stainless steel', 'brass', 'chrome', 'titanium', 'fiberglass'
-        ]
-        
         # Look for explicit material mentions
-        material_patterns = [
-            r'(?:Construction|Material|Made from|Manufactured from):\s*([A-Za-z\s\-/]+)',
-            r'(?:^|\s)(\d+%\s*recycled\s+[a-z]+)',
-            r'(?:high quality|premium)\s+([a-z]+\s+paper)',
-        ]
-        
-        for pattern in material_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _MATERIAL_PATTERNS:
+            if not _can_match(pattern, candidates):
+                continue
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
-        # Look for material keywords
-        text_lower = text.lower()
-        found_materials = []
-        for material in materials:
-            if re.search(rf'\b{material.lower()}\b', text_lower):
-                found_materials.append(material)
+        # Look for material keywords, first three distinct in order of appearance
+        if keyword_hits is None:
+            keyword_hits = _find_keywords(text.lower())
+        found_materials = list(dict.fromkeys(keyword_hits['material']))
         
         if found_materials:
             return ', '.join(found_materials[:3])
         
         return None
     
-    def extract_pattern(self, text: str) -> Optional[str]:
+    def extract_pattern(self, text: str, keyword_hits: Optional[Dict[str, List[str]]] = None,
+                        candidates: Optional[Set] = None) -> Optional[str]:
         """Extract product pattern"""
-        patterns_list = [
-            'striped', 'stripes', 'polka dot', 'floral', 'paisley', 'plaid',
-            'checkered', 'checked', 'chevron', 'geometric', 'animal print',
-            'leopard', 'zebra', 'camouflage', 'camo', 'solid', 'plain'
-        ]
-        
         # Look for explicit pattern mentions
-        pattern_pattern = r'(?:Pattern):\s*([A-Za-z\s\-]+)'
-        match = re.search(pattern_pattern, text, re.IGNORECASE)
+        match = _PATTERN_RE.search(text) if _can_match(_PATTERN_RE, candidates) else None
         if match:
             return match.group(1).strip()
         
         # Look for pattern keywords
-        text_lower = text.lower()
-        for pattern_name in patterns_list:
-            if re.search(rf'\b{pattern_name}\b', text_lower):
-                return pattern_name.capitalize()
+        if keyword_hits is None:
+            keyword_hits = _find_keywords(text.lower())
+        if keyword_hits['pattern']:
+            return keyword_hits['pattern'][0].capitalize()
         
         return None
     
-    def extract_size(self, text: str, title: str = "") -> Optional[str]:
+    def extract_size(self, text: str, title: str = "", candidates: Optional[Set] = None) -> Optional[str]:
         """Extract apparel/product size (S/M/L, numerical sizes, etc)"""
         search_text = f"{title} {text}"
         
         # Apparel sizes
-        apparel_patterns = [
-            r'\b((?:XX?|[23X])?[SML](?:arge|edium|mall)?)\b',  # XS, S, M, L, XL, XXL, etc
-            r'\bsize:?\s*([A-Z0-9\-/]+)\b',
-            r'\b(\d+(?:\.\d+)?)\s*(?:UK|US|EU)\b',  # UK 10, US 8, EU 42
-            r'\bone size\b',
-            r'\bOSFA\b',  # One Size Fits All
-        ]
-        
-        for pattern in apparel_patterns:
-            match = re.search(pattern, search_text, re.IGNORECASE)
+        for pattern in _SIZE_APPAREL_RES:
+            if not _can_match(pattern, candidates):
+                continue
+            match = pattern.search(search_text)
             if match:
                 return match.group(1) if match.groups() else match.group(0)
         
         return None
     
-    def extract_gsm(self, text: str) -> Optional[str]:
+    def extract_gsm(self, text: str, text_lower: Optional[str] = None) -> Optional[str]:
         """Extract GSM (paper weight/density)"""
-        pattern = r'(\d+)\s*GSM'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _GSM_RE.search(text_lower if text_lower is not None else text.lower())
         if match:
             return f"{match.group(1)} GSM"
         return None
     
-    def extract_gtin(self, text: str, soup: BeautifulSoup) -> Optional[str]:
+    def extract_gtin(self, text: str, tree: LexborHTMLParser) -> Optional[str]:
         """Extract GTIN/EAN/UPC/Barcode"""
-        patterns = [
-            r'(?:GTIN|EAN|UPC|Barcode):\s*(\d{8,14})',
-            r'(?:Product Code|Item Code|SKU):\s*([A-Z0-9\-]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _GTIN_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
         # Look for structured data
-        script_tags = soup.find_all('script', type='application/ld+json')
+        script_tags = tree.css('script[type="application/ld+json"]')
         for script in script_tags:
             try:
-                import json
-                data = json.loads(script.string)
+                data = json.loads(script.text())
                 if isinstance(data, dict):
                     if 'gtin' in data:
                         return data['gtin']
@@ -348,53 +717,137 @@ class FeedAttributeScraper:
     
     def extract_motor_info(self, text: str) -> Optional[str]:
         """Extract motor/power information"""
-        pattern = r'(\d+W?\s*(?:motor|watt|power)|\d+W)'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _MOTOR_RE.search(text)
         if match:
             return match.group(0).strip()
         return None
     
     def extract_warranty(self, text: str) -> Optional[str]:
         """Extract warranty information"""
-        pattern = r'(\d+\s*(?:month|year|yr)\s*(?:warranty|guarantee))'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _WARRANTY_RE.search(text)
         if match:
             return match.group(0).strip()
         return None
     
-    def extract_brand(self, text: str, soup: BeautifulSoup) -> Optional[str]:
+    def extract_brand(self, text: str, tree: LexborHTMLParser) -> Optional[str]:
         """Extract brand information"""
-        pattern = r'(?:Brand|Manufacturer):\s*([A-Za-z0-9\s\-&]+)'
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = _BRAND_RE.search(text)
         if match:
             return match.group(1).strip()
         return None
     
-    def extract_table_data(self, soup: BeautifulSoup) -> Dict[str, str]:
+    def extract_table_data(self, tree: LexborHTMLParser) -> Dict[str, str]:
         """Extract structured data from tables if present"""
         data = {}
         
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    key = cells[0].get_text().strip().lower()
-                    value = cells[1].get_text().strip()
-                    
-                    if 'dimension' in key or 'size' in key:
-                        data['size'] = value
-                    elif 'weight' in key:
-                        data['weight'] = value
-                    elif 'colour' in key or 'color' in key:
-                        data['colour'] = value
-                    elif 'material' in key:
-                        data['material'] = value
+        for row in tree.css('table tr'):
+            # Only the first two direct cells are needed (nested tables are visited as their own rows)
+            cells = []
+            for child in row.iter():
+                if child.tag in ('td', 'th'):
+                    cells.append(child)
+                    if len(cells) == 2:
+                        break
+            
+            if len(cells) == 2:
+                key = cells[0].text(separator=' ', strip=True).lower()
+                value = cells[1].text(separator=' ', strip=True)
+                
+                if 'dimension' in key or 'size' in key:
+                    data['size'] = value
+                elif 'weight' in key:
+                    data['weight'] = value
+                elif 'colour' in key or 'color' in key:
+                    data['colour'] = value
+                elif 'material' in key:
+                    data['material'] = value
         
         return data
 
 
+@st.cache_data(show_spinner=False)
+def extract_products_from_xml(xml_content: bytes) -> List[Dict[str, str]]:
+    """Extract product data (ID, title, URL) from Google Shopping XML feed"""
+    products = []
+    try:
+        # Stream <item> elements so memory stays flat for large feeds. Entities, DTDs and
+        # network access are disabled explicitly, as older lxml versions resolve external entities
+        context = etree.iterparse(
+            BytesIO(xml_content),
+            tag='item',
+            huge_tree=False,
+            resolve_entities=False,
+            no_network=True,
+            load_dtd=False,
+        )
+        
+        for _, item in context:
+            product = {}
+            
+            # Extract ID
+            id_elem = item.find(_G_ID)
+            if id_elem is None:
+                id_elem = item.find('id')
+            if id_elem is not None and id_elem.text:
+                product['id'] = id_elem.text.strip()
+            
+            # Extract title
+            title_elem = item.find(_G_TITLE)
+            if title_elem is None:
+                title_elem = item.find('title')
+            if title_elem is not None and title_elem.text:
+                product['title'] = title_elem.text.strip()
+            
+            # Extract link
+            link_elem = item.find(_G_LINK)
+            if link_elem is None:
+                link_elem = item.find('link')
+            if link_elem is not None and link_elem.text:
+                url = link_elem.text.strip()
+                if url.startswith('http'):
+                    product['url'] = url
+            
+            # Only add if we have at least a URL
+            if 'url' in product:
+                products.append(product)
+            
+            # Free the parsed item and any siblings already processed
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+        
+        return products
+        
+    except Exception as e:
+        st.error(f"Error parsing XML: {e}")
+        return []
+
+
+@st.cache_resource
+def get_scraper() -> FeedAttributeScraper:
+    """One scraper per process, so every run shares its Session and per-host throttle (delay is passed per run)"""
+    return FeedAttributeScraper(max_connections=_MAX_WORKERS)
+
+
+def dataframe_to_xlsx(df: pd.DataFrame) -> bytes:
+    """Write a DataFrame to .xlsx bytes using xlsxwriter in constant_memory mode
+    
+    Rows are written in order by hand because pandas' to_excel writes column by column,
+    which constant_memory mode does not support (earlier rows would be dropped).
+    """
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True, 'strings_to_urls': False})
+    worksheet = workbook.add_worksheet()
+    
+    worksheet.write_row(0, 0, df.columns)
+    values = df.astype(object).where(df.notna(), None)
+    for row_num, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_num, 0, row)
+    
+    workbook.close()
+    return buffer.getvalue()
+
+
 def main():
     st.set_page_config(
         page_title="Feed Attribute Scraper",
@@ -418,7 +871,15 @@ def main():
             max_value=5.0,
             value=1.0,
             step=0.5,
-            help="Delay between each product page request to avoid rate limiting"
+            help="Minimum delay between requests to the same website to avoid rate limiting"
+        )
+        
+        workers = st.slider(
+            "Concurrent workers",
+            min_value=1,
+            max_value=_MAX_WORKERS,
+            value=8,
+            help="Number of product pages fetched in parallel"
         )
         
         max_urls = st.number_input(
@@ -454,12 +915,9 @@ def main():
         # Read XML content
         xml_content = uploaded_file.read()
         
-        # Initialize scraper
-        scraper = FeedAttributeScraper()
-        
-        # Extract products with ID, title, and URL
+        # Extract products with ID, title, and URL (cached on the file contents)
         with st.spinner("Extracting products from feed..."):
-            products = scraper.extract_products_from_xml(xml_content)
+            products = extract_products_from_xml(xml_content)
         
         if not products:
             st.error("❌ No products found in the XML feed. Please check your file format.")
@@ -480,8 +938,14 @@ def main():
             if len(products) > 10:
                 st.text(f"... and {len(products) - 10} more")
         
+        # Results are kept per feed and settings, so reruns (e.g. after a download) and
+        # repeat clicks with unchanged inputs reuse them instead of scraping again
+        cache_key = (hashlib.sha256(xml_content).hexdigest(), max_urls, delay)
+        cached = st.session_state.get('scrape_results')
+        
         # Start scraping button
-        if st.button("🚀 Start Scraping", type="primary"):
+        if st.button("🚀 Start Scraping", type="primary") and (cached is None or cached[0] != cache_key):
+            scraper = get_scraper()
             
             # Progress tracking
             progress_bar = st.progress(0)
@@ -490,23 +954,52 @@ def main():
             # Results container
             results_container = st.container()
             
-            all_attributes = []
+            # Keep results in feed order regardless of completion order
+            all_attributes = [None] * len(products)
             
-            # Process each product
+            # Products sharing a URL (e.g. variants) download the page once, but each is parsed
+            # on its own since titles differ and feed into colour, size and dimensions
+            url_to_products = defaultdict(list)
             for i, product in enumerate(products):
-                url = product.get('url', 'Unknown URL')
-                product_id = product.get('id', 'No ID')
-                status_text.text(f"Processing {i+1}/{len(products)}: {product_id} - {url[:50]}...")
-                
-                attributes = scraper.scrape_product_attributes(product)
-                all_attributes.append(attributes)
-                
-                # Update progress
-                progress_bar.progress((i + 1) / len(products))
+                url_to_products[product.get('url', '')].append(i)
+            buckets = list(url_to_products.values())
+            
+            # Download and parse in separate pools so fetch workers move straight on to the
+            # next page while earlier pages are parsed; rate limiting is applied per host
+            with ThreadPoolExecutor(max_workers=workers) as fetch_pool, \
+                    ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as parse_pool:
+                pending = {
+                    fetch_pool.submit(scraper.fetch_product_page, products[bucket[0]], delay): (b, 'fetch')
+                    for b, bucket in enumerate(buckets)
+                }
+                done = 0
                 
-                # Rate limiting
-                if i < len(products) - 1:
-                    time.sleep(delay)
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        key, stage = pending.pop(future)
+                        if stage == 'fetch':
+                            attributes, content = future.result()
+                            if content is not None:
+                                for i in buckets[key]:
+                                    parse = parse_pool.submit(scraper.parse_product_attributes, products[i].copy(), content)
+                                    pending[parse] = (i, 'parse')
+                                continue
+                            
+                            # Download failed: every product on the page gets the same error
+                            for i in buckets[key]:
+                                all_attributes[i] = {**products[i], 'error': attributes['error']}
+                            done += len(buckets[key])
+                        else:
+                            attributes = all_attributes[key] = future.result()
+                            done += 1
+                        
+                        url = attributes.get('url', 'Unknown URL')
+                        product_id = attributes.get('id', 'No ID')
+                        status_text.text(f"Processed {done}/{len(products)}: {product_id} - {url[:50]}...")
+                        
+                        # Update progress
+                        progress_bar.progress(done / len(products))
             
             status_text.text("✅ Scraping complete!")
             
@@ -525,81 +1018,75 @@ def main():
             column_order = [col for col in column_order if col in df.columns]
             df = df[column_order]
             
-            # Calculate statistics
-            total_urls = len(df)
-            urls_with_attributes = len(df[df.apply(lambda x: len([v for v in x if pd.notna(v) and v != '']) > 1, axis=1)])
-            success_rate = (urls_with_attributes / total_urls) * 100 if total_urls > 0 else 0
-            
-            # Display statistics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total URLs", total_urls)
-            with col2:
-                st.metric("Successful Extractions", urls_with_attributes)
-            with col3:
-                st.metric("Success Rate", f"{success_rate:.1f}%")
-            
-            # Display attribute coverage
-            st.subheader("📊 Attribute Coverage")
-            attribute_cols = [col for col in df.columns if col not in ['id', 'title', 'url', 'error']]
-            coverage_data = []
-            
-            for col in attribute_cols:
-                count = df[col].notna().sum()
-                percentage = (count / total_urls) * 100
-                coverage_data.append({
-                    'Attribute': col,
-                    'Found': count,
-                    'Coverage': f"{percentage:.1f}%"
-                })
-            
-            if coverage_data:
-                coverage_df = pd.DataFrame(coverage_data)
-                st.dataframe(coverage_df, use_container_width=True)
-            
-            # Display results table
-            st.subheader("📋 Extracted Data")
-            st.dataframe(df, use_container_width=True)
-            
-            # Download buttons
-            st.subheader("💾 Download Results")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # CSV download
-                csv_buffer = StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="📥 Download as CSV",
-                    data=csv_data,
-                    file_name="supplemental_feed.csv",
-                    mime="text/csv",
-                    help="Download the supplemental feed as CSV for upload to Google Merchant Center"
-                )
+            st.session_state['scrape_results'] = (cache_key, df)
+        elif cached is not None and cached[0] == cache_key:
+            df = cached[1]
+        else:
+            return
+        
+        # Calculate statistics
+        total_urls = len(df)
+        filled = df.notna() & (df != '')
+        urls_with_attributes = int((filled.sum(axis=1) > 1).sum())
+        success_rate = (urls_with_attributes / total_urls) * 100 if total_urls > 0 else 0
+        
+        # Display statistics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total URLs", total_urls)
+        with col2:
+            st.metric("Successful Extractions", urls_with_attributes)
+        with col3:
+            st.metric("Success Rate", f"{success_rate:.1f}%")
+        
+        # Display attribute coverage
+        st.subheader("📊 Attribute Coverage")
+        attribute_cols = [col for col in df.columns if col not in ['id', 'title', 'url', 'error']]
+        
+        if attribute_cols:
+            coverage_df = df[attribute_cols].notna().sum().rename_axis('Attribute').reset_index(name='Found')
+            coverage_df['Coverage'] = (coverage_df['Found'] / total_urls * 100).map('{:.1f}%'.format)
+            st.dataframe(coverage_df, use_container_width=True)
+        
+        # Display results table
+        st.subheader("📋 Extracted Data")
+        st.dataframe(df, use_container_width=True)
+        
+        # Download buttons
+        st.subheader("💾 Download Results")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # CSV download
+            csv_data = df.to_csv(index=False).encode('utf-8')
             
-            with col2:
-                # Excel download
-                excel_buffer = BytesIO()
-                df.to_excel(excel_buffer, index=False, engine='openpyxl')
-                excel_data = excel_buffer.getvalue()
-                
-                st.download_button(
-                    label="📥 Download as Excel",
-                    data=excel_data,
-                    file_name="supplemental_feed.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    help="Download as Excel file for analysis"
-                )
+            st.download_button(
+                label="📥 Download as CSV",
+                data=csv_data,
+                file_name="supplemental_feed.csv",
+                mime="text/csv",
+                help="Download the supplemental feed as CSV for upload to Google Merchant Center"
+            )
+        
+        with col2:
+            # Excel download
+            excel_data = dataframe_to_xlsx(df)
             
-            # Show errors if any
-            if 'error' in df.columns:
-                errors_df = df[df['error'].notna()]
-                if len(errors_df) > 0:
-                    with st.expander(f"⚠️ Errors ({len(errors_df)} URLs)"):
-                        st.dataframe(errors_df[['url', 'error']], use_container_width=True)
+            st.download_button(
+                label="📥 Download as Excel",
+                data=excel_data,
+                file_name="supplemental_feed.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                help="Download as Excel file for analysis"
+            )
+        
+        # Show errors if any
+        if 'error' in df.columns:
+            errors_df = df[df['error'].notna()]
+            if len(errors_df) > 0:
+                with st.expander(f"⚠️ Errors ({len(errors_df)} URLs)"):
+                    st.dataframe(errors_df[['url', 'error']], use_container_width=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+"""Checks that the hyperscan prefilter never rules out a regex Python would match
+
+Run with: python -m pytest
+"""
+import sys
+
+import pytest
+
+import app
+
+
+# Page text with the Unicode whitespace, digits and case folds where hyperscan and Python's re disagree
+SAMPLES = [
+    'Dimensions:\xa0120\xa0x\xa060\xa0cm Weight:\xa05\xa0kg',
+    'Size: ١٢٠ × ٦٠ ft 5　kgs Net: 6 g',
+    'Table size: 120mm (L) x 60mm 12 cm wide',
+    '10cm\x85(L)\x85x\x855cm\x85(W)\x85x\x853cm\x85(H) 2 x 3 m 7"\x1cx\x1d3\x1eft',
+    'Width:\xa060cm Height:\xa090cm Depth:\xa040cm',
+    'Colour: Navy Finish: Oak Navy　Fabric RGB\xa0Values:\xa0(1, 2, 3)',
+    'Material: Oak 100% recycled card premium white\x1fpaper Pattern: Striped',
+    'Xſ 42\xa0EU OſFA İNK KG ſize:\xa0M sİze: L İS 6İ × 2KM',
+]
+
+
+def python_matches(pattern, text: str) -> bool:
+    # The dimension regex runs on lower-cased text, the rest on the text as is
+    return pattern.search(text.lower() if pattern is app._DIM_COMBINED else text) is not None
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_prefilter_keeps_every_python_match(text):
+    if app._PRESCAN_DB is None:
+        pytest.skip('hyperscan is not installed')
+
+    candidates = app._prescan(text)
+    missed = [p.pattern for p in app._PRESCAN_PATTERNS if p not in candidates and python_matches(p, text)]
+    assert not missed
+
+
+def test_translation_covers_unicode_whitespace_and_digits():
+    for codepoint in range(0x80, sys.maxunicode + 1):
+        char = chr(codepoint)
+        if char.isspace():
+            assert app._PRESCAN_TRANSLATION.get(codepoint) == ' ', hex(codepoint)
+        elif char.isdecimal():
+            assert app._PRESCAN_TRANSLATION.get(codepoint) == str(int(char)), hex(codepoint)
+
+    for char in '\t\n\v\f\r\x1c\x1d\x1e\x1f':
+        assert app._PRESCAN_TRANSLATION.get(ord(char)) == ' '
+
+
+def test_translation_covers_ascii_case_folds():
+    ascii_letter = app.re.compile('[a-z]', app.re.IGNORECASE)
+    for codepoint in range(0x80, sys.maxunicode + 1):
+        char = chr(codepoint)
+        if ascii_letter.fullmatch(char):
+            letter = app._PRESCAN_TRANSLATION.get(codepoint)
+            assert letter is not None and app.re.fullmatch(letter, char, app.re.IGNORECASE), hex(codepoint)